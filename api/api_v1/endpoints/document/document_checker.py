@@ -1,17 +1,173 @@
-from fastapi import APIRouter, Depends
-from schemas.document.document_checker import SDocumentChecker
+from fastapi import APIRouter, Depends, UploadFile
+from schemas.document.document_checker import SDocumentChecker, SBatchDocumentChecker
 from controllers.document.document_checker import DocumentController
-from helpers.exceptions import json_response
+from helpers.admission import admission, AdmissionRejected
+from helpers.deadline import Deadline
+from helpers.exceptions import json_response, ndjson_response, summary_record
+from core.config import settings
 from http import HTTPStatus
 from helpers.logging import logging
+from tempfile import SpooledTemporaryFile
+from typing import Optional
+import asyncio
 
 router = APIRouter()
 
+
+async def _upload_size(file: UploadFile) -> int:
+    if file.size is not None:
+        return file.size
+    file.file.seek(0, 2)
+    size = file.file.tell()
+    file.file.seek(0)
+    return size
+
+
+async def _check_with_admission(params: SDocumentChecker) -> tuple[bool, list[dict], str]:
+    deadline = Deadline.from_settings()
+
+    # Tolak sebelum parsing: ukuran file & antrian lane (PDF belum tahu lane-nya)
+    file_size = await _upload_size(params.file)
+    filename = (params.file.filename or "").lower()
+    admission.check_upload(file_size, None if filename.endswith(".pdf") else "image")
+
+    # Bytes + PdfReader yang menunggu admit ikut dihitung di memory budget
+    async with admission.hold(file_size):
+        try:
+            profile = await DocumentController.admission_profile(params, deadline)
+        except asyncio.TimeoutError:
+            raise AdmissionRejected(
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                "Time budget exceeded while reading document, try again later",
+                settings.ADMISSION_RETRY_AFTER,
+            )
+        cost = admission.estimate_cost(profile.document_class, profile.file_size)
+
+        # Analisa jalan di threadpool (lihat DocumentController), jadi limit lane
+        # benar-benar membatasi jumlah dokumen yang diproses paralel.
+        async with admission.admit(
+            profile.document_class,
+            cost,
+            timeout=deadline.remaining(),
+            held=file_size
+        ):
+            return await DocumentController.document_checker(params, deadline, profile)
+
+
+async def _buffer_upload(file: UploadFile) -> tuple[Optional[SDocumentChecker], Optional[str]]:
+    """Copy an upload to a spooled temp file (RAM up to UPLOAD_SPOOL_MAX_BYTES, then disk).
+
+    FastAPI closes the original upload before a StreamingResponse runs.
+    Returns (params, None) or (None, error message) when the file exceeds MAX_UPLOAD_BYTES.
+    """
+    spooled = SpooledTemporaryFile(max_size=settings.UPLOAD_SPOOL_MAX_BYTES)
+    size = 0
+    while chunk := await file.read(1024 * 1024):
+        size += len(chunk)
+        if size > settings.MAX_UPLOAD_BYTES:
+            spooled.close()
+            return None, f"File too large, maximum is {settings.MAX_UPLOAD_BYTES} bytes"
+        spooled.write(chunk)
+
+    spooled.seek(0)
+    return SDocumentChecker(file=UploadFile(file=spooled, filename=file.filename, size=size)), None
+
+
+def _analysis_failed(data: list[dict]) -> bool:
+    # detect_manipulation_* return None kalau analisa gagal
+    return not data or any(value is None for item in data for value in item.values())
+
+
+async def _stream_documents(documents: list[tuple[str, Optional[SDocumentChecker], Optional[str]]]):
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+    async def run(index: int, file_name: str, params: Optional[SDocumentChecker], error: Optional[str]) -> dict:
+        record = {"type": "document", "index": index, "file_name": file_name}
+        if error:
+            record.update({"status": False, "data": None, "message": error})
+            return record
+
+        # Close di luar semaphore: task yang di-cancel saat menunggu slot juga menutup temp file-nya
+        try:
+            async with semaphore:
+                try:
+                    status, data, msg = await _check_with_admission(params)
+                    if status and _analysis_failed(data):
+                        status, msg = False, "Analysis failed"
+                    record.update({"status": status, "data": data, "message": msg})
+                except AdmissionRejected as e:
+                    record.update({
+                        "status": False,
+                        "data": None,
+                        "message": str(e),
+                        "status_code": e.status_code,
+                        "retry_after": e.retry_after,
+                    })
+                except Exception as e:
+                    logging.log_error({
+                        "module": __name__,
+                        "function": "_stream_documents",
+                        "error": "Error checking document",
+                        "detail": str(e)
+                    })
+                    record.update({"status": False, "data": None, "message": f"Internal Server Error: {str(e)}"})
+        finally:
+            await params.file.close()
+        return record
+
+    tasks = []
+    for i, document in enumerate(documents):
+        task = asyncio.create_task(run(i, *document))
+        params = document[1]
+        if params is not None:
+            # Task yang di-cancel sebelum sempat jalan tidak pernah masuk finally di run()
+            task.add_done_callback(lambda _, f=params.file: f.file.close())
+        tasks.append(task)
+    failed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            record = await next_done
+            if not record["status"]:
+                failed += 1
+            yield record
+    finally:
+        # Client disconnect -> hentikan dokumen yang belum selesai
+        for task in tasks:
+            task.cancel()
+
+    yield summary_record(
+        "success" if not failed else f"{failed} of {len(documents)} documents failed",
+        {"total": len(documents), "succeeded": len(documents) - failed, "failed": failed},
+        failed == 0
+    )
+
+
 @router.post("/document_checker")
-async def document_checker(params: SDocumentChecker = Depends()):
+async def document_checker(params: SDocumentChecker = Depends(), stream: bool = False):
     try:
-        status, data, msg = await DocumentController.document_checker(params)
+        if stream:
+            buffered, error = await _buffer_upload(params.file)
+            if error:
+                return json_response(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, error, data=None, success=False)
+            return ndjson_response(_stream_documents([(params.file.filename, buffered, None)]))
+
+        status, data, msg = await _check_with_admission(params)
         return json_response(HTTPStatus.OK if status else HTTPStatus.BAD_REQUEST, msg, data, status)
+    except AdmissionRejected as e:
+        logging.log_info({
+            "module": __name__,
+            "function": "document_checker",
+            "msg": "Request rejected by admission control",
+            "detail": str(e),
+            "admission": admission.stats()
+        })
+        return json_response(
+            e.status_code,
+            str(e),
+            data=None,
+            success=False,
+            headers={"Retry-After": str(e.retry_after)} if e.retry_after else None
+        )
     except Exception as e:
         logging.log_error({
             "module": __name__,
@@ -20,5 +176,32 @@ async def document_checker(params: SDocumentChecker = Depends()):
             "detail": str(e)
         })
         return json_response(HTTPStatus.INTERNAL_SERVER_ERROR, f"Internal Server Error: {str(e)}", data=None, success=False)
-    
 
+
+@router.post("/document_checker/batch")
+async def document_checker_batch(params: SBatchDocumentChecker = Depends()):
+    try:
+        if not params.files:
+            return json_response(HTTPStatus.BAD_REQUEST, "No files uploaded", data=None, success=False)
+
+        if len(params.files) > settings.BATCH_MAX_FILES:
+            return json_response(
+                HTTPStatus.BAD_REQUEST,
+                f"Too many files, maximum is {settings.BATCH_MAX_FILES}",
+                data=None,
+                success=False
+            )
+
+        documents = []
+        for file in params.files:
+            buffered, error = await _buffer_upload(file)
+            documents.append((file.filename, buffered, error))
+        return ndjson_response(_stream_documents(documents))
+    except Exception as e:
+        logging.log_error({
+            "module": __name__,
+            "function": "document_checker_batch",
+            "error": "Error checking document batch",
+            "detail": str(e)
+        })
+        return json_response(HTTPStatus.INTERNAL_SERVER_ERROR, f"Internal Server Error: {str(e)}", data=None, success=False)
\ No newline at end of file
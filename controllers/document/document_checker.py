@@ -1,30 +1,62 @@
-from schemas.document.document_checker import SDocumentChecker
+from schemas.document.document_checker import SDocumentChecker, SDocumentProfile, SPdfMetadata
+from controllers.document.pdf_metadata import PdfMetadataController
+from fastapi.concurrency import run_in_threadpool
 from pypdf import PdfReader
 from pdf2image import convert_from_bytes
+from pdf2image.exceptions import PDFPopplerTimeoutError
 from PIL import Image, ImageChops, ImageEnhance
+import asyncio
 import base64
 import io
+import math
 from helpers.logging import logging
+from helpers.deadline import Deadline
 from typing import Optional
 import pytesseract
 import numpy as np
 
+# Resolution planner (scanned PDF)
+DEFAULT_RENDER_DPI = 200    # dipakai kalau resolusi asli image tidak diketahui
+MAX_RENDER_DPI = 300        # batas atas render walaupun scan aslinya lebih tajam
+MIN_RENDER_DPI = 100        # batas bawah render supaya OCR/stamp/variance tidak jalan di thumbnail
+MIN_SCAN_COVERAGE = 0.5     # image dianggap hasil scan kalau menutupi >= 50% halaman
+MIN_SCAN_DPI = 150          # di bawah ini dianggap low_dpi_scan
+OCR_TARGET_GLYPH_PX = 20    # tinggi huruf minimum (px) supaya Tesseract akurat
+OCR_BODY_TEXT_PT = 10       # asumsi ukuran font body dokumen
+OCR_REFERENCE_DPI = 200     # threshold OCR dikalibrasi di 200 DPI
+
+# ELA / pixel analysis
+ELA_SIZE = (800, 800)
+ELA_JPEG_QUALITY = 75
+ELA_BRIGHTNESS = 30
+INK_THRESHOLD = 100         # grayscale < 100 dianggap tinta
+VARIANCE_BLOCK_SIZE = 50
+PIXEL_REFERENCE_DPI = 200   # VARIANCE_BLOCK_SIZE & threshold variance dikalibrasi di 200 DPI
+
 class DocumentController:
 
     @classmethod
-    async def document_checker(cls, params: SDocumentChecker) -> tuple[bool, list[dict], str]:
+    async def document_checker(
+        cls,
+        params: SDocumentChecker,
+        deadline: Optional[Deadline] = None,
+        profile: Optional[SDocumentProfile] = None
+    ) -> tuple[bool, list[dict], str]:
         try:
             if not params.file or not params.file.filename:
                 return False, [], "File has no name"
 
             filename = params.file.filename.lower()
+            deadline = deadline or Deadline.from_settings()
 
             if filename.endswith(".pdf"):
-                result_pdf = await cls.detect_manipulation_pdf(params)
+                result_pdf = await cls.detect_manipulation_pdf(params, deadline, profile)
+                if result_pdf and result_pdf.get("partial"):
+                    return True, [{"pdf_analysis": result_pdf}], "partial result: time budget exceeded"
                 return True, [{"pdf_analysis": result_pdf}], "success"
 
             else:
-                result_ela = await cls.detect_manipulation_ela(params)
+                result_ela = await cls.detect_manipulation_ela(params, profile)
                 return True, [{"image_analysis": result_ela}], "success"
         except Exception as e:
             logging.log_error({
@@ -35,210 +67,497 @@ class DocumentController:
             })
             return False, [], f"Error fetching document: {str(e)}"
     
-    @staticmethod
-    async def detect_manipulation_ela(params: SDocumentChecker) -> Optional[dict]:
+    @classmethod
+    async def detect_manipulation_ela(
+        cls,
+        params: SDocumentChecker,
+        profile: Optional[SDocumentProfile] = None
+    ) -> Optional[dict]:
         try:
             # Baca file
-            image_bytes = await params.file.read()
-            image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+            if profile and profile.file_bytes is not None:
+                image_bytes = profile.file_bytes
+            else:
+                image_bytes = await params.file.read()
 
-            # Normalisasi ukuran supaya analisa konsisten
-            image = image.resize((800, 800), Image.Resampling.LANCZOS)
+            # PIL blocking -> jalankan di threadpool supaya event loop tetap bebas
+            return await run_in_threadpool(cls.analyse_image, params.file.filename, image_bytes)
+        except Exception as e:
+            logging.log_error({
+                "module": __name__,
+                "function": "document_checker", 
+                "error": "Error during document checker", 
+                "detail": str(e)
+            })
+            return None
 
-            # Simpan ulang dengan kompresi rendah
-            temp = io.BytesIO()
-            image.save(temp, "JPEG", quality=75)  # lebih sensitif
-            temp_image = Image.open(temp)
+    @classmethod
+    def analyse_image(cls, file_name: str, image_bytes: bytes) -> dict:
+        """Sync ELA analysis, run off the event loop."""
+        image, temp_image = cls.normalize_ela_image(image_bytes)
+
+        # Hitung difference (ELA raw image)
+        diff = ImageChops.difference(image, temp_image)
+
+        # Perkuat difference agar terlihat
+        diff_enhanced = ImageEnhance.Brightness(diff).enhance(ELA_BRIGHTNESS)
+
+        # Hitung skor manipulasi dari tiap pixel
+        diff_gray = diff_enhanced.convert("L")
+        pixels = list(diff_gray.getdata())
+
+        avg_diff = sum(pixels) / len(pixels)   # rata-rata intensitas noise
+        score = round(avg_diff, 2)
+
+        # Convert heatmap ke base64
+        buffer = io.BytesIO()
+        diff_enhanced.save(buffer, format="JPEG")
+        heatmap_base64 = base64.b64encode(buffer.getvalue()).decode()
+
+        result = {
+            "file_name": file_name,
+            "manipulation_score": score,
+            "status": cls.ela_status(score),
+            # "ela_heatmap": heatmap_base64
+            "partial": False,
+            "skipped_checks": []
+        }
+        return result
 
-            # Hitung difference (ELA raw image)
-            diff = ImageChops.difference(image, temp_image)
+    @staticmethod
+    def normalize_ela_image(image_bytes: bytes) -> tuple[Image.Image, Image.Image]:
+        """Decode + resize to ELA_SIZE, return (image, JPEG re-compressed image)."""
+        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
 
-            # Perkuat difference agar terlihat
-            diff_enhanced = ImageEnhance.Brightness(diff).enhance(30)
+        # Normalisasi ukuran supaya analisa konsisten
+        image = image.resize(ELA_SIZE, Image.Resampling.LANCZOS)
 
-            # Hitung skor manipulasi dari tiap pixel
-            diff_gray = diff_enhanced.convert("L")
-            pixels = list(diff_gray.getdata())
+        # Simpan ulang dengan kompresi rendah
+        temp = io.BytesIO()
+        image.save(temp, "JPEG", quality=ELA_JPEG_QUALITY)  # lebih sensitif
+        temp_image = Image.open(temp)
 
-            avg_diff = sum(pixels) / len(pixels)   # rata-rata intensitas noise
-            score = round(avg_diff, 2)
+        return image, temp_image
 
-            # Convert heatmap ke base64
-            buffer = io.BytesIO()
-            diff_enhanced.save(buffer, format="JPEG")
-            heatmap_base64 = base64.b64encode(buffer.getvalue()).decode()
+    @staticmethod
+    def ela_status(score: float) -> str:
+        return (
+            "likely original" if score < 10 else
+            "possibly fake" if score < 25 else
+            "likely fake"
+        )
 
-            # Tentukan status
-            status_text = (
-                "likely original" if score < 10 else
-                "possibly fake" if score < 25 else
-                "likely fake"
+    @classmethod
+    async def detect_manipulation_pdf(
+        cls,
+        params: SDocumentChecker,
+        deadline: Optional[Deadline] = None,
+        profile: Optional[SDocumentProfile] = None
+    ) -> Optional[dict]:
+        deadline = deadline or Deadline(None)
+        try:
+            if profile and profile.file_bytes is not None:
+                pdf_bytes = profile.file_bytes
+            else:
+                pdf_bytes = await params.file.read()
+
+            # pypdf / poppler / tesseract blocking -> threadpool
+            return await run_in_threadpool(
+                cls.analyse_pdf,
+                params.file.filename,
+                pdf_bytes,
+                deadline,
+                profile.reader if profile else None,
+                profile.metadata if profile else None,
+                profile.document_class if profile and profile.reader else None
             )
-
-            result = {
-                "file_name": params.file.filename,
-                "manipulation_score": score,
-                "status": status_text,
-                # "ela_heatmap": heatmap_base64
-            }
-            return result
         except Exception as e:
             logging.log_error({
                 "module": __name__,
-                "function": "document_checker", 
-                "error": "Error during document checker", 
-                "detail": str(e)
+                "function": "detect_manipulation_pdf",
+                "error": str(e)
             })
             return None
-        
-    @classmethod
-    async def detect_manipulation_pdf(cls, params: SDocumentChecker) -> Optional[dict]:
-        try:
-            pdf_bytes = await params.file.read()
-            reader = PdfReader(io.BytesIO(pdf_bytes))
-
-            # ---------------------------------------------------------
-            # 1. Extract metadata
-            # ---------------------------------------------------------
-            metadata = reader.metadata or {}
-            clean_meta = {k.replace("/", ""): str(v) for k, v in metadata.items()}
-
-            producer = (metadata.get("/Producer") or "").lower()
-            creator = (metadata.get("/Creator") or "").lower()
-
-            DIGITAL_IMAGE_PRODUCERS = [
-                "mpdf", "wkhtml", "wkhtmltopdf", "itext", "weasyprint",
-                "aspose", "tcpdf", "libreoffice", "reportlab", "samsung", 
-                "xerox", "canon", "epson", "hp", "mfp", "scanner"
-            ]
-
-            is_digital_image_pdf = any(p in producer for p in DIGITAL_IMAGE_PRODUCERS)
-
-            # flag metadata
-            metadata_flags = []
-
-            if not metadata:
-                metadata_flags.append("metadata_missing")
-
-            if not is_digital_image_pdf:
-                if producer and "adobe" not in producer.lower():
-                    metadata_flags.append("unusual_producer")
-
-            # ---------------------------------------------------------
-            # 2. Determine PDF Type
-            # ---------------------------------------------------------
-            first_page = reader.pages[0]
-            resources = first_page.get("/Resources", {})
-            xobjects = resources.get("/XObject", {})
-
-            # scan PDF has XObject images
-            is_scanned_pdf = any(
-                obj.get("/Subtype") == "/Image" for obj in xobjects.values()
-            )
-
-            # ---------------------------------------------------------
-            # 3. DIGITAL-IMAGE PDF (Talenta, BPJS, etc)
-            # ---------------------------------------------------------
-            if is_digital_image_pdf:
-                digital_flags = []
-
-                # annotate?
-                if "/Annots" in first_page:
-                    digital_flags.append("annotations_detected")
-
-                # multi-layer object?
-                if len(xobjects) > 3:
-                    digital_flags.append("multiple_layers_detected")
-
-                risk_score = 10 * len(metadata_flags) + 10 * len(digital_flags)
-
-                return {
-                    "file_name": params.file.filename,
-                    "pdf_type": "digital_image_pdf",
-                    "is_encrypted": reader.is_encrypted,
-                    "metadata": clean_meta,
-                    "metadata_flags": metadata_flags,
-                    "digital_edit_flags": digital_flags,
-                    "risk_score": risk_score,
-                    "status": "digital_document_original" if risk_score < 25 else "digital_document_possibly_modified"
-                }
-
-            # ---------------------------------------------------------
-            # 4. SCANNED PDF (physical document)
-            # ---------------------------------------------------------
-            if is_scanned_pdf:
-                images = convert_from_bytes(pdf_bytes, dpi=200)
-                img = images[0]
-
-                ocr_info = cls.ocr_consistency_check(img)
-                stamp_info = cls.detect_stamp_signature(img)
-                variance_info = cls.pixel_block_variance(img)
-
-                anomalies = []
-
-                # DPI check
-                dpi = img.info.get("dpi", (0, 0))
-                if dpi[0] < 150 or dpi[1] < 150:
-                    anomalies.append("low_dpi_scan")
-
-                # annotation
-                if "/Annots" in first_page:
-                    anomalies.append("annotations_present")
-
-                risk_score = (
-                    10 * len(metadata_flags) +
-                    (20 if ocr_info.get("ocr_status") == "possible_text_edit" else 0) +
-                    (15 if stamp_info["stamp_likelihood"] == "stamp_detected" else 0) +
-                    (15 if variance_info["block_status"] == "possible_pasted_element" else 0) +
-                    10 * len(anomalies)
-                )
 
-                return {
-                    "file_name": params.file.filename,
-                    "pdf_type": "scanned_pdf",
-                    "is_encrypted": reader.is_encrypted,
-                    "metadata": clean_meta,
-                    "metadata_flags": metadata_flags,
-                    "scan_anomalies": anomalies,
-                    "advanced_ocr_check": ocr_info,
-                    "stamp_detection": stamp_info,
-                    "pixel_variance": variance_info,
-                    "risk_score": risk_score,
-                    "status": "scanned_document_original" if risk_score < 35 else "scanned_document_possibly_modified"
-                }
-
-            # ---------------------------------------------------------
-            # 5. Default: pure digital PDF
-            # ---------------------------------------------------------
+    @classmethod
+    def analyse_pdf(
+        cls,
+        file_name: str,
+        pdf_bytes: bytes,
+        deadline: Deadline,
+        reader: Optional[PdfReader] = None,
+        metadata: Optional[SPdfMetadata] = None,
+        pdf_type: Optional[str] = None
+    ) -> dict:
+        """Sync PDF analysis, run off the event loop. Reuses the admission pre-check parse if given."""
+        reader = reader or PdfReader(io.BytesIO(pdf_bytes))
+
+        # ---------------------------------------------------------
+        # 1. Extract metadata
+        # ---------------------------------------------------------
+        metadata = metadata or PdfMetadataController.extract(reader)
+        clean_meta = metadata.info
+
+        pdf_type = pdf_type or cls.classify_pdf(reader, metadata)
+        is_digital_image_pdf = pdf_type == "digital_image_pdf"
+
+        # flag metadata
+        metadata_flags = []
+
+        if not metadata.info:
+            metadata_flags.append("metadata_missing")
+
+        if not is_digital_image_pdf:
+            if metadata.producer and metadata.producer_class != "adobe":
+                metadata_flags.append("unusual_producer")
+
+        # ---------------------------------------------------------
+        # 2. Determine PDF Type
+        # ---------------------------------------------------------
+        first_page = reader.pages[0]
+        resources = first_page.get("/Resources", {})
+        xobjects = resources.get("/XObject", {})
+
+        is_scanned_pdf = pdf_type == "scanned_pdf"
+
+        # ---------------------------------------------------------
+        # 3. DIGITAL-IMAGE PDF (Talenta, BPJS, etc)
+        # ---------------------------------------------------------
+        if is_digital_image_pdf:
             digital_flags = []
 
+            # annotate?
             if "/Annots" in first_page:
                 digital_flags.append("annotations_detected")
 
-            if len(xobjects) > 5:
+            # multi-layer object?
+            if len(xobjects) > 3:
                 digital_flags.append("multiple_layers_detected")
 
             risk_score = 10 * len(metadata_flags) + 10 * len(digital_flags)
 
             return {
-                "file_name": params.file.filename,
-                "pdf_type": "digital_pdf",
+                "file_name": file_name,
+                "pdf_type": "digital_image_pdf",
                 "is_encrypted": reader.is_encrypted,
                 "metadata": clean_meta,
                 "metadata_flags": metadata_flags,
                 "digital_edit_flags": digital_flags,
                 "risk_score": risk_score,
-                "status": "digital_document_original" if risk_score < 25 else "digital_document_possibly_modified"
+                "status": "digital_document_original" if risk_score < 25 else "digital_document_possibly_modified",
+                "partial": False,
+                "skipped_checks": []
             }
 
-        except Exception as e:
-            logging.log_error({
-                "module": __name__,
-                "function": "detect_manipulation_pdf",
-                "error": str(e)
-            })
-            return None
-        
+        # ---------------------------------------------------------
+        # 4. SCANNED PDF (physical document)
+        # ---------------------------------------------------------
+        if is_scanned_pdf:
+            # Stage yang tidak sempat jalan dalam time budget di-skip
+            skipped_checks = []
+
+            # Baca content stream (CTM) hanya kalau masih ada budget
+            resolution = None
+            if not deadline.expired():
+                try:
+                    resolution = cls.plan_scan_resolution(first_page, deadline)
+                except TimeoutError:
+                    resolution = None
+
+            if resolution is None:
+                resolution = cls.plan_scan_resolution(first_page, walk_content=False)
+                skipped_checks.append("scan_resolution")
+            img = None
+            ocr_info, stamp_info, variance_info = {}, {}, {}
+
+            if not deadline.expired():
+                try:
+                    # Render halaman pertama saja, di resolusi asli (tanpa upsampling)
+                    images = convert_from_bytes(
+                        pdf_bytes,
+                        dpi=resolution["render_dpi"],
+                        first_page=1,
+                        last_page=1,
+                        timeout=deadline.timeout()
+                    )
+                    img = images[0]
+                except PDFPopplerTimeoutError:
+                    # poppler sudah di-kill oleh pdf2image
+                    img = None
+
+            if img is None:
+                skipped_checks += ["advanced_ocr_check", "stamp_detection", "pixel_variance"]
+            else:
+                if deadline.expired():
+                    skipped_checks.append("advanced_ocr_check")
+                else:
+                    ocr_img = img
+                    if resolution["ocr_dpi"] < resolution["render_dpi"]:
+                        scale = resolution["ocr_dpi"] / resolution["render_dpi"]
+                        ocr_img = img.resize(
+                            (max(1, round(img.width * scale)), max(1, round(img.height * scale))),
+                            Image.Resampling.LANCZOS
+                        )
+
+                    ocr_info = cls.ocr_consistency_check(
+                        ocr_img,
+                        dpi=resolution["ocr_dpi"],
+                        timeout=deadline.timeout()
+                    )
+                    if ocr_info.get("ocr_status") == "ocr_timeout":
+                        skipped_checks.append("advanced_ocr_check")
+
+                if deadline.expired():
+                    skipped_checks.append("stamp_detection")
+                else:
+                    # ink_ratio = persentase area, tidak tergantung DPI
+                    stamp_info = cls.detect_stamp_signature(img)
+
+                if deadline.expired():
+                    skipped_checks.append("pixel_variance")
+                else:
+                    variance_info = cls.pixel_block_variance(img, dpi=resolution["render_dpi"])
+
+            anomalies = []
+
+            # DPI check (resolusi asli scan, bukan DPI render)
+            source_dpi = resolution["source_dpi"]
+            if source_dpi is not None and min(source_dpi) < MIN_SCAN_DPI:
+                anomalies.append("low_dpi_scan")
+
+            # annotation
+            if "/Annots" in first_page:
+                anomalies.append("annotations_present")
+
+            risk_score = (
+                10 * len(metadata_flags) +
+                (20 if ocr_info.get("ocr_status") == "possible_text_edit" else 0) +
+                (15 if stamp_info.get("stamp_likelihood") == "stamp_detected" else 0) +
+                (15 if variance_info.get("block_status") == "possible_pasted_element" else 0) +
+                10 * len(anomalies)
+            )
+
+            # Semua check hanya menambah skor: skor partial >= 35 tetap valid,
+            # tapi di bawah itu jangan pernah dianggap "original".
+            if risk_score >= 35:
+                status = "scanned_document_possibly_modified"
+            elif skipped_checks:
+                status = "scanned_document_incomplete"
+            else:
+                status = "scanned_document_original"
+
+            return {
+                "file_name": file_name,
+                "pdf_type": "scanned_pdf",
+                "is_encrypted": reader.is_encrypted,
+                "metadata": clean_meta,
+                "metadata_flags": metadata_flags,
+                "scan_anomalies": anomalies,
+                "scan_resolution": resolution,
+                "advanced_ocr_check": ocr_info,
+                "stamp_detection": stamp_info,
+                "pixel_variance": variance_info,
+                "risk_score": risk_score,
+                "status": status,
+                "partial": bool(skipped_checks),
+                "skipped_checks": skipped_checks
+            }
+
+        # ---------------------------------------------------------
+        # 5. Default: pure digital PDF
+        # ---------------------------------------------------------
+        digital_flags = []
+
+        if "/Annots" in first_page:
+            digital_flags.append("annotations_detected")
+
+        if len(xobjects) > 5:
+            digital_flags.append("multiple_layers_detected")
+
+        risk_score = 10 * len(metadata_flags) + 10 * len(digital_flags)
+
+        return {
+            "file_name": file_name,
+            "pdf_type": "digital_pdf",
+            "is_encrypted": reader.is_encrypted,
+            "metadata": clean_meta,
+            "metadata_flags": metadata_flags,
+            "digital_edit_flags": digital_flags,
+            "risk_score": risk_score,
+            "status": "digital_document_original" if risk_score < 25 else "digital_document_possibly_modified",
+            "partial": False,
+            "skipped_checks": []
+        }
+
+    @classmethod
+    async def admission_profile(
+        cls,
+        params: SDocumentChecker,
+        deadline: Optional[Deadline] = None
+    ) -> SDocumentProfile:
+        """Cheap pre-check used by admission control, parsed off the event loop.
+
+        The parsed reader/metadata are handed to the analysis so the PDF is only parsed once.
+        Raises asyncio.TimeoutError when parsing does not finish within the deadline.
+        """
+        file_bytes = await params.file.read()
+        await params.file.seek(0)
+
+        # asyncio.to_thread (bukan run_in_threadpool) supaya bisa ditinggal saat
+        # deadline habis; parsing dibatasi MAX_UPLOAD_BYTES jadi thread tetap selesai.
+        return await asyncio.wait_for(
+            asyncio.to_thread(cls.profile_document, params.file.filename or "", file_bytes),
+            timeout=deadline.remaining() if deadline else None
+        )
+
+    @classmethod
+    def profile_document(cls, filename: str, file_bytes: bytes) -> SDocumentProfile:
+        if not filename.lower().endswith(".pdf"):
+            return SDocumentProfile(document_class="image", file_size=len(file_bytes), file_bytes=file_bytes)
+
+        try:
+            reader = PdfReader(io.BytesIO(file_bytes))
+            metadata = PdfMetadataController.extract(reader)
+            return SDocumentProfile(
+                document_class=cls.classify_pdf(reader, metadata),
+                file_size=len(file_bytes),
+                file_bytes=file_bytes,
+                reader=reader,
+                metadata=metadata,
+            )
+        except Exception:
+            # PDF rusak -> anggap mahal, analisa penuh yang akan melaporkan error
+            return SDocumentProfile(document_class="scanned_pdf", file_size=len(file_bytes), file_bytes=file_bytes)
+
+    @staticmethod
+    def classify_pdf(reader: PdfReader, metadata: Optional[SPdfMetadata] = None) -> str:
+        """Return pdf_type: digital_image_pdf, scanned_pdf or digital_pdf."""
+        # Triage pertama: metadata saja (trailer /Info + XMP), tanpa baca halaman
+        metadata = metadata or PdfMetadataController.extract(reader)
+
+        if metadata.producer_class == "digital_image":
+            return "digital_image_pdf"
+
+        first_page = reader.pages[0]
+        resources = first_page.get("/Resources", {})
+        xobjects = resources.get("/XObject", {})
+
+        # scan PDF has XObject images
+        if any(obj.get("/Subtype") == "/Image" for obj in xobjects.values()):
+            return "scanned_pdf"
+
+        return "digital_pdf"
+
+    @staticmethod
+    def _placed_images(page, deadline: Optional[Deadline] = None) -> list[tuple[int, int, float, float]]:
+        """(width_px, height_px, placed_width_pt, placed_height_pt) per image drawn on the page.
+
+        Placed size comes from the CTM in the page content stream; images drawn
+        inside form XObjects are not followed. Raises TimeoutError when the
+        deadline runs out during the walk.
+        """
+        resources = page.get("/Resources", {})
+        xobjects = resources.get("/XObject", {})
+        contents = page.get_contents()
+        if not xobjects or contents is None:
+            return []
+
+        placed = []
+        ctm = [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]
+        stack = []
+
+        operations = contents.operations
+        for i, (operands, operator) in enumerate(operations):
+            if deadline is not None and i % 1000 == 0 and deadline.expired():
+                raise TimeoutError()
+
+            if operator == b"q":
+                stack.append(ctm)
+            elif operator == b"Q":
+                ctm = stack.pop() if stack else [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]
+            elif operator == b"cm" and len(operands) == 6:
+                a, b, c, d, e, f = (float(x) for x in operands)
+                # CTM' = M x CTM
+                ctm = [
+                    a * ctm[0] + b * ctm[2],
+                    a * ctm[1] + b * ctm[3],
+                    c * ctm[0] + d * ctm[2],
+                    c * ctm[1] + d * ctm[3],
+                    e * ctm[0] + f * ctm[2] + ctm[4],
+                    e * ctm[1] + f * ctm[3] + ctm[5],
+                ]
+            elif operator == b"Do" and operands:
+                obj = xobjects.get(operands[0])
+                if obj is None:
+                    continue
+                obj = obj.get_object()
+                if obj.get("/Subtype") != "/Image":
+                    continue
+                # Image = unit square yang di-map oleh CTM
+                placed.append((
+                    int(obj.get("/Width", 0)),
+                    int(obj.get("/Height", 0)),
+                    math.hypot(ctm[0], ctm[1]),
+                    math.hypot(ctm[2], ctm[3]),
+                ))
+        return placed
+
+    @classmethod
+    def plan_scan_resolution(
+        cls,
+        page,
+        deadline: Optional[Deadline] = None,
+        walk_content: bool = True
+    ) -> dict:
+        """Pick render/OCR DPI from the native resolution of the page's scan image.
+
+        Only images covering most of the page count as the scan; logos and
+        other small images fall back to DEFAULT_RENDER_DPI. walk_content=False
+        skips the content stream and plans with the default DPI.
+        """
+        source_dpi = None
+
+        if walk_content:
+            try:
+                page_area = float(page.mediabox.width) * float(page.mediabox.height)
+
+                # Ambil image terbesar di halaman (biasanya hasil scan full page)
+                best = None
+                for width_px, height_px, width_pt, height_pt in cls._placed_images(page, deadline):
+                    area = width_pt * height_pt
+                    if width_px > 0 and height_px > 0 and area > 0 and (best is None or area > best[0]):
+                        best = (area, width_px, height_px, width_pt, height_pt)
+
+                if best and page_area > 0 and best[0] / page_area >= MIN_SCAN_COVERAGE:
+                    _, width_px, height_px, width_pt, height_pt = best
+                    source_dpi = (round(width_px * 72 / width_pt, 1), round(height_px * 72 / height_pt, 1))
+            except TimeoutError:
+                raise
+            except Exception as e:
+                logging.log_error({
+                    "module": __name__,
+                    "function": "plan_scan_resolution",
+                    "error": "Error reading scan image placement",
+                    "detail": str(e)
+                })
+                source_dpi = None
+
+        if source_dpi is None:
+            render_dpi = DEFAULT_RENDER_DPI
+        else:
+            # Jangan upsample di atas resolusi asli, kecuali scan di bawah MIN_RENDER_DPI
+            render_dpi = max(MIN_RENDER_DPI, min(int(min(source_dpi)), MAX_RENDER_DPI))
+
+        # DPI termurah yang masih memenuhi tinggi huruf target
+        ocr_target_dpi = int(round(OCR_TARGET_GLYPH_PX * 72 / OCR_BODY_TEXT_PT))
+        ocr_dpi = min(render_dpi, ocr_target_dpi)
+
+        return {
+            "source_dpi": source_dpi,
+            "render_dpi": render_dpi,
+            "ocr_dpi": ocr_dpi,
+        }
+
     # @classmethod
     # async def detect_manipulation_pdf(cls, params: SDocumentChecker) -> Optional[dict]:
     #     try:
@@ -370,10 +689,19 @@ class DocumentController:
     #         return None
 
     @staticmethod
-    def ocr_consistency_check(image: Image.Image) -> dict:
+    def ocr_consistency_check(
+        image: Image.Image,
+        dpi: int = OCR_REFERENCE_DPI,
+        timeout: Optional[float] = None
+    ) -> dict:
         """Check OCR uniformity to detect edited text in scanned PDF."""
         try:
-            data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+            # timeout: pytesseract kill proses tesseract kalau lewat (0 = tanpa batas)
+            data = pytesseract.image_to_data(
+                image,
+                output_type=pytesseract.Output.DICT,
+                timeout=timeout or 0
+            )
 
             # Ambil jarak antar bounding box
             boxes = []
@@ -385,7 +713,8 @@ class DocumentController:
             if len(boxes) < 5:
                 return {"ocr_status": "insufficient_text"}
 
-            heights = [b[3] for b in boxes]  # list height teks
+            # list height teks, dinormalisasi ke OCR_REFERENCE_DPI
+            heights = [b[3] * OCR_REFERENCE_DPI / dpi for b in boxes]
 
             std_height = float(np.std(heights))
 
@@ -398,6 +727,10 @@ class DocumentController:
                     "possible_text_edit"
                 )
             }
+        except RuntimeError as e:
+            if str(e) == "Tesseract process timeout":
+                return {"ocr_status": "ocr_timeout"}
+            return {"ocr_status": "ocr_failed", "detail": str(e)}
         except Exception as e:
             return {"ocr_status": "ocr_failed", "detail": str(e)}  
         
@@ -409,25 +742,27 @@ class DocumentController:
         gray = img_np[:, :, 0] * 0.299 + img_np[:, :, 1] * 0.587 + img_np[:, :, 2] * 0.114
 
         # Cek spot tinta kuat (threshold)
-        ink_spots = (gray < 100).astype(np.uint8).sum()
+        ink_spots = (gray < INK_THRESHOLD).astype(np.uint8).sum()
 
         # Ratio tinta
         ink_ratio = round((ink_spots / gray.size) * 100, 2)
 
         return {
             "ink_ratio": ink_ratio,
-            "stamp_likelihood": (
-                "stamp_detected" if ink_ratio > 1.5 else "no_stamp_detected"
-            )
+            "stamp_likelihood": DocumentController.stamp_likelihood(ink_ratio)
         }
+
+    @staticmethod
+    def stamp_likelihood(ink_ratio: float) -> str:
+        return "stamp_detected" if ink_ratio > 1.5 else "no_stamp_detected"
     
     @staticmethod
-    def pixel_block_variance(image: Image.Image) -> dict:
+    def pixel_block_variance(image: Image.Image, dpi: int = PIXEL_REFERENCE_DPI) -> dict:
         img = image.convert("L")
         pixels = np.array(img)
 
         h, w = pixels.shape
-        block_size = 50
+        block_size = DocumentController.variance_block_size(dpi)
 
         variances = []
 
@@ -440,12 +775,21 @@ class DocumentController:
 
         return {
             "block_variance": avg_var,
-            "block_status": (
-                "uniform_document"
-                if avg_var < 300 else
-                "possible_pasted_element"
-            )
+            "block_status": DocumentController.block_status(avg_var)
         }
+
+    @staticmethod
+    def variance_block_size(dpi: int) -> int:
+        # Block menutupi area fisik yang sama seperti 50px di 200 DPI
+        return max(1, round(VARIANCE_BLOCK_SIZE * dpi / PIXEL_REFERENCE_DPI))
+
+    @staticmethod
+    def block_status(avg_var: float) -> str:
+        return (
+            "uniform_document"
+            if avg_var < 300 else
+            "possible_pasted_element"
+        )
     
     @staticmethod
     def calculate_pdf_risk(
@@ -0,0 +1,131 @@
+from schemas.document.document_checker import SPdfMetadata
+from core.config import settings
+from helpers.logging import logging
+from pypdf import PdfReader
+from functools import lru_cache
+from typing import Optional
+import json
+import re
+import zlib
+
+# pdf:Producer / xmp:CreatorTool, dalam bentuk element atau attribute ("..." / '...')
+_XMP_PRODUCER = re.compile(rb'pdf:Producer(?:>|=["\'])([^<"\']*)')
+_XMP_CREATOR = re.compile(rb'xmp:CreatorTool(?:>|=["\'])([^<"\']*)')
+
+
+@lru_cache(maxsize=4)
+def load_signatures(path: str) -> tuple[tuple[str, re.Pattern], ...]:
+    """Compile the signature file into (class, regex) pairs, in file order."""
+    with open(path, encoding="utf-8") as f:
+        signatures = json.load(f)
+
+    compiled = []
+    for producer_class, keywords in signatures.items():
+        # Keyword kosong akan match semua producer -> buang; class tanpa keyword di-skip
+        keywords = [k for k in keywords if isinstance(k, str) and k.strip()]
+        if not keywords:
+            continue
+        # Keyword terpanjang dulu supaya alternation tidak berhenti di prefix
+        keywords = sorted(keywords, key=len, reverse=True)
+        pattern = re.compile("|".join(re.escape(k) for k in keywords), re.IGNORECASE)
+        compiled.append((producer_class, pattern))
+    return tuple(compiled)
+
+
+class PdfMetadataController:
+
+    @staticmethod
+    def classify(value: str, path: Optional[str] = None) -> Optional[str]:
+        """First signature class whose keyword occurs in value (case-insensitive)."""
+        if not value:
+            return None
+        for producer_class, pattern in load_signatures(path or settings.PRODUCER_SIGNATURES_PATH):
+            if pattern.search(value):
+                return producer_class
+        return None
+
+    @staticmethod
+    def _truncate(value) -> tuple[str, bool]:
+        value = value if isinstance(value, str) else str(value)
+        if len(value) > settings.METADATA_MAX_VALUE_CHARS:
+            return value[:settings.METADATA_MAX_VALUE_CHARS], True
+        return value, False
+
+    @staticmethod
+    def _read_xmp(xmp) -> tuple[Optional[bytes], bool]:
+        """(XMP bytes decoded to at most XMP_MAX_BYTES, truncated); bytes None if the filter can't be bounded."""
+        filters = xmp.get("/Filter")
+        if filters is None:
+            # Tidak dikompres: /Length sudah dicek <= XMP_MAX_BYTES
+            return xmp.get_data()[:settings.XMP_MAX_BYTES], False
+
+        if not isinstance(filters, str):
+            filters = filters[0] if len(filters) == 1 else None
+        if filters != "/FlateDecode" or xmp.get("/DecodeParms") is not None:
+            return None, True
+
+        # Dekompresi dibatasi, supaya zip bomb kecil tidak meledak di memory
+        decompressor = zlib.decompressobj()
+        data = decompressor.decompress(xmp._data, settings.XMP_MAX_BYTES)
+        return data, bool(decompressor.unconsumed_tail)
+
+    @classmethod
+    def extract(cls, reader: PdfReader) -> SPdfMetadata:
+        """Read trailer /Info + XMP only (no page walk) and classify producer/creator."""
+        info = {}
+        truncated = False
+
+        metadata = reader.metadata or {}
+        for i, (key, value) in enumerate(metadata.items()):
+            if i >= settings.METADATA_MAX_KEYS:
+                truncated = True
+                break
+            if hasattr(value, "get_object"):
+                value = value.get_object()
+            info[key.replace("/", "")], cut = cls._truncate(value)
+            truncated = truncated or cut
+
+        # Klasifikasi & scoring tetap dari /Info; nilai XMP dilaporkan terpisah
+        producer = info.get("Producer", "")
+        creator = info.get("Creator", "")
+        xmp_producer, xmp_creator = "", ""
+
+        has_xmp = False
+        try:
+            xmp = reader.trailer["/Root"].get("/Metadata")
+            if xmp is not None:
+                has_xmp = True
+                xmp = xmp.get_object()
+
+                # XMP raksasa tidak di-decode, cukup ditandai
+                if int(xmp.get("/Length", 0)) > settings.XMP_MAX_BYTES:
+                    truncated = True
+                else:
+                    data, cut = cls._read_xmp(xmp)
+                    truncated = truncated or cut
+                    data = data or b""
+                    if match := _XMP_PRODUCER.search(data):
+                        xmp_producer, cut = cls._truncate(match.group(1).decode("utf-8", "replace").strip())
+                        truncated = truncated or cut
+                    if match := _XMP_CREATOR.search(data):
+                        xmp_creator, cut = cls._truncate(match.group(1).decode("utf-8", "replace").strip())
+                        truncated = truncated or cut
+        except Exception as e:
+            logging.log_error({
+                "module": __name__,
+                "function": "extract",
+                "error": "Error reading XMP metadata",
+                "detail": str(e)
+            })
+
+        return SPdfMetadata(
+            info=info,
+            producer=producer,
+            creator=creator,
+            producer_class=cls.classify(producer),
+            creator_class=cls.classify(creator),
+            xmp_producer=xmp_producer,
+            xmp_creator=xmp_creator,
+            has_xmp=has_xmp,
+            truncated=truncated,
+        )
@@ -1,10 +1,40 @@
 from pydantic_settings import BaseSettings
 from typing import ClassVar
+import os
 
 class Settings(BaseSettings):
     API_V1_STR: str = "/api/api_v1"
     env: ClassVar[str] = 'dev'  # Ditandai sebagai ClassVar
     environment_route: ClassVar[str] = 'dev'
+
+    # Admission control: image / digital_pdf / digital_image_pdf ("light")
+    # dan scanned_pdf ("scan") punya antrian sendiri, supaya request murah
+    # tetap jalan saat banyak scan masuk bersamaan.
+    ADMISSION_LIGHT_CONCURRENCY: int = 8
+    ADMISSION_LIGHT_QUEUE: int = 32
+    ADMISSION_SCAN_CONCURRENCY: int = 2
+    ADMISSION_SCAN_QUEUE: int = 4
+    ADMISSION_MEMORY_BUDGET_MB: int = 1024
+    ADMISSION_LIGHT_COST_MB: int = 32
+    ADMISSION_SCAN_COST_MB: int = 320
+    ADMISSION_QUEUE_TIMEOUT: float = 10.0
+    ADMISSION_RETRY_AFTER: int = 5
+    MAX_UPLOAD_BYTES: int = 20 * 1024 * 1024   # berlaku untuk semua endpoint
+
+    # Batch document checker (streaming NDJSON)
+    BATCH_MAX_FILES: int = 50
+    BATCH_CONCURRENCY: int = 4
+    UPLOAD_SPOOL_MAX_BYTES: int = 1024 * 1024   # lebih besar dari ini di-spool ke disk
+
+    # Time budget per dokumen (detik), termasuk waktu tunggu di antrian.
+    # Stage yang belum selesai saat budget habis di-skip (partial result).
+    REQUEST_TIME_BUDGET: float = 20.0
+
+    # Metadata PDF: signature /Producer & /Creator + batas ukuran value
+    PRODUCER_SIGNATURES_PATH: str = os.path.join(os.path.dirname(__file__), "producer_signatures.json")
+    METADATA_MAX_KEYS: int = 32
+    METADATA_MAX_VALUE_CHARS: int = 256
+    XMP_MAX_BYTES: int = 256 * 1024
     
     class Config:  # Harus diawali huruf besar
         case_sensitive = True
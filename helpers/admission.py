@@ -0,0 +1,200 @@
+import asyncio
+from contextlib import asynccontextmanager
+from core.config import settings
+from typing import Optional
+from starlette.status import (
+    HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    HTTP_429_TOO_MANY_REQUESTS,
+    HTTP_503_SERVICE_UNAVAILABLE,
+)
+
+MB = 1024 * 1024
+
+# Mapping document class -> lane
+LIGHT_LANE = "light"
+SCAN_LANE = "scan"
+
+DOCUMENT_LANES = {
+    "image": LIGHT_LANE,
+    "digital_pdf": LIGHT_LANE,
+    "digital_image_pdf": LIGHT_LANE,
+    "scanned_pdf": SCAN_LANE,
+}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted (queue full / memory budget exhausted)."""
+
+    def __init__(self, status_code: int, message: str, retry_after: Optional[int]):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class _Lane:
+    def __init__(self, name: str, concurrency: int, queue_size: int, base_cost: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.base_cost = base_cost
+        self.active = 0
+        self.waiting = 0
+
+
+class AdmissionController:
+    """Per-lane concurrency + queue limits sharing one memory budget."""
+
+    def __init__(
+        self,
+        lanes: list[_Lane],
+        memory_budget: int,
+        queue_timeout: float,
+        retry_after: int
+    ):
+        self._lanes = {lane.name: lane for lane in lanes}
+        self._memory_budget = memory_budget
+        self._queue_timeout = queue_timeout
+        self._retry_after = retry_after
+        self._reserved = 0
+        self._cond = asyncio.Condition()
+
+    @classmethod
+    def from_settings(cls, config=settings) -> "AdmissionController":
+        return cls(
+            lanes=[
+                _Lane(
+                    LIGHT_LANE,
+                    config.ADMISSION_LIGHT_CONCURRENCY,
+                    config.ADMISSION_LIGHT_QUEUE,
+                    config.ADMISSION_LIGHT_COST_MB * MB,
+                ),
+                _Lane(
+                    SCAN_LANE,
+                    config.ADMISSION_SCAN_CONCURRENCY,
+                    config.ADMISSION_SCAN_QUEUE,
+                    config.ADMISSION_SCAN_COST_MB * MB,
+                ),
+            ],
+            memory_budget=config.ADMISSION_MEMORY_BUDGET_MB * MB,
+            queue_timeout=config.ADMISSION_QUEUE_TIMEOUT,
+            retry_after=config.ADMISSION_RETRY_AFTER,
+        )
+
+    def estimate_cost(self, document_class: str, file_size: int) -> int:
+        """Rough peak memory (bytes) of one analysis: lane base cost + decoded upload."""
+        lane = self._lanes[DOCUMENT_LANES.get(document_class, SCAN_LANE)]
+        # Request yang lebih besar dari budget tetap boleh jalan sendirian
+        return min(lane.base_cost + 2 * file_size, self._memory_budget)
+
+    def _can_run(self, lane: _Lane, cost: int) -> bool:
+        return (
+            lane.active < lane.concurrency and
+            self._reserved + cost <= self._memory_budget
+        )
+
+    def check_upload(self, file_size: int, document_class: Optional[str] = None):
+        """Reject before any parsing: upload too large, or every candidate lane saturated.
+
+        document_class None (PDF not classified yet) means the document may end up in any lane.
+        """
+        if file_size > settings.MAX_UPLOAD_BYTES:
+            raise AdmissionRejected(
+                HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                f"File too large, maximum is {settings.MAX_UPLOAD_BYTES} bytes",
+                None,
+            )
+
+        if document_class is None:
+            lanes = list(self._lanes.values())
+        else:
+            lanes = [self._lanes[DOCUMENT_LANES.get(document_class, SCAN_LANE)]]
+
+        if all(lane.active >= lane.concurrency and lane.waiting >= lane.queue_size for lane in lanes):
+            raise AdmissionRejected(
+                HTTP_429_TOO_MANY_REQUESTS,
+                "Too many documents in progress, try again later",
+                self._retry_after,
+            )
+
+    @asynccontextmanager
+    async def hold(self, nbytes: int):
+        """Count an upload being profiled / waiting for admit() against the memory budget."""
+        async with self._cond:
+            if self._reserved + nbytes > self._memory_budget:
+                raise AdmissionRejected(
+                    HTTP_503_SERVICE_UNAVAILABLE,
+                    "Server is busy, try again later",
+                    self._retry_after,
+                )
+            self._reserved += nbytes
+
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._reserved -= nbytes
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            "reserved_mb": round(self._reserved / MB, 2),
+            "budget_mb": round(self._memory_budget / MB, 2),
+            "lanes": {
+                name: {"active": lane.active, "waiting": lane.waiting}
+                for name, lane in self._lanes.items()
+            },
+        }
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        document_class: str,
+        cost: int,
+        timeout: Optional[float] = None,
+        held: int = 0
+    ):
+        """Wait for a lane slot; `held` bytes are already reserved via hold() and not counted twice."""
+        lane = self._lanes[DOCUMENT_LANES.get(document_class, SCAN_LANE)]
+        cost = max(0, cost - held)
+        # Jangan menunggu di antrian lebih lama dari sisa time budget request
+        if timeout is None or timeout > self._queue_timeout:
+            timeout = self._queue_timeout
+
+        async with self._cond:
+            if not self._can_run(lane, cost):
+                # Antrian penuh -> tolak cepat, jangan tunggu
+                if lane.waiting >= lane.queue_size:
+                    raise AdmissionRejected(
+                        HTTP_429_TOO_MANY_REQUESTS,
+                        f"Too many {lane.name} documents in progress, try again later",
+                        self._retry_after,
+                    )
+
+                lane.waiting += 1
+                try:
+                    await asyncio.wait_for(
+                        self._cond.wait_for(lambda: self._can_run(lane, cost)),
+                        timeout=timeout,
+                    )
+                except asyncio.TimeoutError:
+                    raise AdmissionRejected(
+                        HTTP_503_SERVICE_UNAVAILABLE,
+                        "Server is busy, try again later",
+                        self._retry_after,
+                    )
+                finally:
+                    lane.waiting -= 1
+
+            lane.active += 1
+            self._reserved += cost
+
+        try:
+            yield
+        finally:
+            async with self._cond:
+                lane.active -= 1
+                self._reserved -= cost
+                self._cond.notify_all()
+
+
+admission = AdmissionController.from_settings()
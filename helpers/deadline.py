@@ -0,0 +1,32 @@
+import time
+from core.config import settings
+from typing import Optional
+
+
+class Deadline:
+    """Per-request time budget, passed down the analysis pipeline."""
+
+    def __init__(self, budget: Optional[float]):
+        self.budget = budget
+        self._expires_at = time.monotonic() + budget if budget else None
+
+    @classmethod
+    def from_settings(cls, config=settings) -> "Deadline":
+        return cls(config.REQUEST_TIME_BUDGET)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None when there is no budget."""
+        if self._expires_at is None:
+            return None
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def timeout(self, minimum: float = 0.1) -> Optional[float]:
+        """Timeout for a subprocess call (poppler / tesseract); 0 means no-timeout there."""
+        remaining = self.remaining()
+        if remaining is None:
+            return None
+        return max(minimum, remaining)
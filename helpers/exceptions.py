@@ -1,5 +1,5 @@
 from fastapi import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.status import (
     HTTP_200_OK,
@@ -11,7 +11,8 @@ from starlette.status import (
     HTTP_422_UNPROCESSABLE_ENTITY,
     HTTP_500_INTERNAL_SERVER_ERROR,
 )
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Optional
+import orjson
 
 
 # ✅ Helper untuk response sukses / error konsisten
@@ -20,7 +21,8 @@ def json_response(
     message: str,
     data: Optional[Any] = None,
     success: bool = True,
-    extra: Optional[dict] = None
+    extra: Optional[dict] = None,
+    headers: Optional[dict] = None
 ):
     base_content = {
         "status": success,
@@ -35,9 +37,57 @@ def json_response(
     return JSONResponse(
         status_code=status_code,
         content=base_content,
+        headers=headers,
     )
 
 
+def _orjson_default(obj: Any):
+    # numpy scalar (np.float64, np.int64, ...) -> tipe Python
+    if hasattr(obj, "item"):
+        return obj.item()
+    return str(obj)
+
+
+def ndjson_dumps(record: dict) -> bytes:
+    return orjson.dumps(
+        record,
+        default=_orjson_default,
+        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE,
+    )
+
+
+# ✅ Streaming response: satu record NDJSON per dokumen, ditutup record summary
+def ndjson_response(
+    records: AsyncIterator[dict],
+    status_code: int = HTTP_200_OK,
+    headers: Optional[dict] = None
+):
+    async def body():
+        async for record in records:
+            yield ndjson_dumps(record)
+
+    return StreamingResponse(
+        body(),
+        status_code=status_code,
+        media_type="application/x-ndjson",
+        headers=headers,
+    )
+
+
+def summary_record(
+    message: str,
+    data: Optional[Any] = None,
+    success: bool = True
+) -> dict:
+    # Envelope sama dengan json_response supaya client lama tetap bisa baca
+    return {
+        "type": "summary",
+        "status": success,
+        "data": data,
+        "message": message,
+    }
+
+
 # ✅ 200 OK (misal untuk response sukses tanpa insert)
 async def ok_response(request: Request, message: str = "Success", data=None):
     return json_response(HTTP_200_OK, message, data, True)
@@ -1,5 +1,28 @@
 from fastapi import UploadFile
 from pydantic import BaseModel
+from typing import Any, Optional
 
 class SDocumentChecker(BaseModel):
-    file: UploadFile
\ No newline at end of file
+    file: UploadFile
+
+class SBatchDocumentChecker(BaseModel):
+    files: list[UploadFile]
+
+class SPdfMetadata(BaseModel):
+    info: dict[str, str]
+    producer: str = ""
+    creator: str = ""
+    producer_class: Optional[str] = None
+    creator_class: Optional[str] = None
+    xmp_producer: str = ""
+    xmp_creator: str = ""
+    has_xmp: bool = False
+    truncated: bool = False
+
+class SDocumentProfile(BaseModel):
+    # Hasil pre-check admission, dipakai ulang oleh analisa (PDF cukup di-parse sekali)
+    document_class: str
+    file_size: int
+    file_bytes: Optional[bytes] = None
+    reader: Optional[Any] = None
+    metadata: Optional[SPdfMetadata] = None
\ No newline at end of file
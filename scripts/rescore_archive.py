@@ -0,0 +1,194 @@
+"""Offline re-scoring of an image archive with the vectorised batch checks.
+
+Jalankan dari root repo:
+
+    python -m scripts.rescore_archive /data/archive.zip --output rescored.ndjson
+    python -m scripts.rescore_archive /data/images/ --scan-checks --dpi 300
+    python -m scripts.rescore_archive /data/images/ --verify 20
+
+Output: satu record NDJSON per image + satu record summary (envelope sama
+dengan endpoint). --verify membandingkan hasil batch dengan fungsi
+single-image DocumentController dan keluar dengan exit code 1 kalau beda.
+"""
+from controllers.document.batch_scoring import BatchScoringController
+from controllers.document.document_checker import DocumentController, PIXEL_REFERENCE_DPI
+from helpers.exceptions import ndjson_dumps, summary_record
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from typing import Iterator, Optional
+import argparse
+import io
+import numpy as np
+import os
+import sys
+import time
+import zipfile
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp", ".webp")
+
+
+def iter_archive(source: str) -> Iterator[tuple[str, bytes]]:
+    """(name, bytes) for every image in a directory tree or a .zip archive."""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for name in sorted(archive.namelist()):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield name, archive.read(name)
+        return
+
+    for root, _, files in os.walk(source):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(root, name)
+                with open(path, "rb") as f:
+                    yield os.path.relpath(path, source), f.read()
+
+
+def iter_batches(items: Iterator, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _decode(image_bytes: bytes) -> Optional[Image.Image]:
+    try:
+        return Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    except Exception:
+        return None
+
+
+def score_batch(
+    files: list[tuple[str, bytes]],
+    executor: Optional[ProcessPoolExecutor],
+    scan_checks: bool,
+    dpi: int
+) -> list[dict]:
+    ela = BatchScoringController.detect_manipulation_ela_batch(files, executor)
+    records = [
+        {"type": "document", "file_name": name, "image_analysis": result}
+        for (name, _), result in zip(files, ela)
+    ]
+
+    if scan_checks:
+        decoded = [_decode(image_bytes) for _, image_bytes in files]
+        valid = [i for i, image in enumerate(decoded) if image is not None]
+        images = [decoded[i] for i in valid]
+        stamps = BatchScoringController.detect_stamp_signature_batch(images)
+        variances = BatchScoringController.pixel_block_variance_batch(images, [dpi] * len(images))
+        for i, stamp, variance in zip(valid, stamps, variances):
+            records[i]["stamp_detection"] = stamp
+            records[i]["pixel_variance"] = variance
+
+    return records
+
+
+def _synthetic_images() -> list[Image.Image]:
+    # Ukuran bukan kelipatan block size -> block pinggir ikut dicek
+    rng = np.random.default_rng(0)
+    images = []
+    for w, h in [(123, 77), (800, 800), (257, 1031), (1001, 333)]:
+        pixels = rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+        # Area gelap supaya threshold tinta / variance tidak trivial
+        pixels[: h // 3, : w // 4] //= 3
+        images.append(Image.fromarray(pixels, "RGB"))
+    return images
+
+
+def verify(files: list[tuple[str, bytes]], dpi: int) -> list[str]:
+    """Compare batch results against the single-image functions; return mismatch descriptions."""
+    mismatches = []
+
+    ela = BatchScoringController.detect_manipulation_ela_batch(files)
+    for (name, image_bytes), batch_result in zip(files, ela):
+        try:
+            single = DocumentController.analyse_image(name, image_bytes)
+        except Exception:
+            single = None
+        if single != batch_result:
+            mismatches.append(f"ela {name}: single={single} batch={batch_result}")
+
+    images = [image for image in (_decode(b) for _, b in files) if image is not None]
+    images += _synthetic_images()
+
+    stamps = BatchScoringController.detect_stamp_signature_batch(images)
+    for i, (image, batch_result) in enumerate(zip(images, stamps)):
+        single = DocumentController.detect_stamp_signature(image)
+        if single != batch_result:
+            mismatches.append(f"stamp #{i} {image.size}: single={single} batch={batch_result}")
+
+    for check_dpi in sorted({PIXEL_REFERENCE_DPI, dpi, 150, 300}):
+        variances = BatchScoringController.pixel_block_variance_batch(images, [check_dpi] * len(images))
+        for i, (image, batch_result) in enumerate(zip(images, variances)):
+            single = DocumentController.pixel_block_variance(image, dpi=check_dpi)
+            if single != batch_result:
+                mismatches.append(
+                    f"variance #{i} {image.size} dpi={check_dpi}: single={single} batch={batch_result}"
+                )
+
+    return mismatches
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Re-score an image archive with the batch checks")
+    parser.add_argument("source", help="directory or .zip archive of images")
+    parser.add_argument("--output", help="NDJSON output file (default: stdout)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes for decode/resize/JPEG re-compress (1 = in-process)")
+    parser.add_argument("--scan-checks", action="store_true",
+                        help="also run stamp detection and block variance on the decoded images")
+    parser.add_argument("--dpi", type=int, default=PIXEL_REFERENCE_DPI,
+                        help="render DPI of the images, used for block variance")
+    parser.add_argument("--verify", type=int, metavar="N",
+                        help="only compare batch vs single-image results on the first N images")
+    args = parser.parse_args(argv)
+
+    if args.verify is not None:
+        files = [f for _, f in zip(range(args.verify), iter_archive(args.source))]
+        mismatches = verify(files, args.dpi)
+        for mismatch in mismatches:
+            print(mismatch, file=sys.stderr)
+        print(f"verified {len(files)} archive images + synthetic images: {len(mismatches)} mismatches",
+              file=sys.stderr)
+        return 1 if mismatches else 0
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    executor = ProcessPoolExecutor(args.workers) if args.workers > 1 else None
+    total = failed = 0
+    started = time.monotonic()
+
+    try:
+        for files in iter_batches(iter_archive(args.source), args.batch_size):
+            for record in score_batch(files, executor, args.scan_checks, args.dpi):
+                total += 1
+                failed += record["image_analysis"] is None
+                out.write(ndjson_dumps(record))
+            out.flush()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    elapsed = time.monotonic() - started
+    out.write(ndjson_dumps(summary_record(
+        "success" if not failed else f"{failed} of {total} images failed",
+        {
+            "total": total,
+            "succeeded": total - failed,
+            "failed": failed,
+            "elapsed_seconds": round(elapsed, 2),
+            "images_per_second": round(total / elapsed, 2) if elapsed else None,
+        },
+        failed == 0
+    )))
+    if args.output:
+        out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())